@@ -1,11 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+from numba import njit
 import io
-from docx import Document
 from datetime import datetime
-from fpdf import FPDF
 import re
 import traceback
+import xlsxwriter
+from xml.sax.saxutils import escape
+from python_calamine import CalamineWorkbook
+
+_NORM_RE   = re.compile(r"[^a-z]")
+_QUOTE_TBL = str.maketrans("", "", "`’‘")
 
 st.set_page_config(page_title="Payroll Summary Generator", layout="wide")
 
@@ -34,18 +40,33 @@ if not st.session_state.logged_in:
     st.stop()
 
 
+# ——— normalized column index ———
+def _norm_col_index(df):
+    """
+    Map each normalized column name (non-letters stripped, lowercased) to the
+    first original column carrying it. Keys come from df.attrs["norm_cols"],
+    filled once after upload; only labels missing from it are normalized here.
+    """
+    norm_cols = df.attrs.get("norm_cols", {})
+    index = {}
+    for col in df.columns:
+        key = norm_cols.get(col)
+        if key is None:
+            key = _NORM_RE.sub("", col.lower())
+        index.setdefault(key, col)
+    return index
+
 # ——— helper to sum normalized column names ———
 def sum_norm(df, *target_names):
     """
     For each name in target_names, normalize (strip non-letters, lowercase)
     and look for a matching column in df. Return the .sum() of the first match.
     """
+    idx = _norm_col_index(df)
     for target in target_names:
-        tgt_key = re.sub(r"[^a-z]", "", target.lower())
-        for col in df.columns:
-            col_key = re.sub(r"[^a-z]", "", col.lower())
-            if col_key == tgt_key:
-                return df[col].sum()
+        col = idx.get(_NORM_RE.sub("", target.lower()))
+        if col is not None:
+            return df[col].sum()
     return 0
 
 st.title("📊 Payroll Summary Generator")
@@ -60,87 +81,200 @@ if not uploaded_file:
     st.info("Please upload an Excel file above to proceed.")
     st.stop()
 
-# ——— load & detect header ———
-xlsx    = pd.ExcelFile(uploaded_file)
-sheet   = st.selectbox("Select a sheet to process", xlsx.sheet_names)
-preview = pd.read_excel(uploaded_file, sheet_name=sheet, header=None)
-hdr_row = preview[preview.eq("No.").any(axis=1)].index[0]
-df_raw  = pd.read_excel(uploaded_file, sheet_name=sheet, header=hdr_row)
+# ——— load & detect header (cached per uploaded file) ———
+UPLOAD_CACHE_ENTRIES = 4   # parsed uploads kept per server process
+
+def _find_header_row(raw):
+    """
+    Return the position of the first row containing "No.", or None.
+    "No." sits in column A by convention, so the first few columns are
+    checked before falling back to the whole frame.
+    """
+    hits = (raw.iloc[:, :3].to_numpy(dtype=object) == "No.").any(axis=1)
+    if not hits.any():
+        hits = (raw.to_numpy(dtype=object) == "No.").any(axis=1)
+        if not hits.any():
+            return None
+    return int(np.argmax(hits))
+
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES)
+def _load_workbook(file_bytes):
+    """Return the sheet names of the uploaded workbook."""
+    return CalamineWorkbook.from_filelike(io.BytesIO(file_bytes)).sheet_names
+
+def _header_labels(row):
+    """
+    Turn the detected header row into column labels the way read_excel's
+    header= does: blank cells become "Unnamed: i", repeats get ".1", ".2"...
+    """
+    labels, seen = [], set()
+    for i, val in enumerate(row):
+        label = f"Unnamed: {i}" if pd.isna(val) or val == "" else val
+        base, k = label, 0
+        while label in seen:
+            k += 1
+            label = f"{base}.{k}"
+        seen.add(label)
+        labels.append(label)
+    return labels
+
+@st.cache_data(max_entries=UPLOAD_CACHE_ENTRIES)
+def _load_sheet(file_bytes, sheet):
+    """
+    Parse one sheet, locate the row holding the "No." header and return
+    (df_raw, hdr_row) with that row used as the column header.
+    """
+    # calamine parses the whole sheet regardless of nrows, so read it once
+    # and take the header from the parsed frame instead of re-reading
+    raw     = pd.read_excel(io.BytesIO(file_bytes), sheet_name=sheet, header=None, engine="calamine")
+    hdr_row = _find_header_row(raw)
+    if hdr_row is None:
+        return None, None
+    df_raw  = raw.iloc[hdr_row + 1:].dropna(how="all").reset_index(drop=True).infer_objects()
+    df_raw.columns = _header_labels(raw.iloc[hdr_row])
+    return df_raw, hdr_row
+
+file_bytes      = uploaded_file.getvalue()
+sheet           = st.selectbox("Select a sheet to process", _load_workbook(file_bytes))
+df_raw, hdr_row = _load_sheet(file_bytes, sheet)
+if hdr_row is None:
+    st.error("❌ Header row (a cell reading \"No.\") not found in this sheet.")
+    st.stop()
 
 # ——— clean column names ———
-df_raw.columns = (
-    df_raw.columns
-          .str.replace("`", "", regex=False)
-          .str.replace("’", "", regex=False)
-          .str.replace("‘", "", regex=False)
-          .str.strip()
-)
+df_raw.columns = df_raw.columns.map(lambda s: s.translate(_QUOTE_TBL).strip())
 df_raw = (
     df_raw
     .rename(columns={"EPFEE": "EPF", "SocEE": "Socso", "EISEE": "EIS"})
     .loc[:, ~df_raw.columns.duplicated()]
     .reset_index(drop=True)
 )
+# normalize labels once per upload; carried along by slices and copies of df_raw
+df_raw.attrs["norm_cols"] = {c: _NORM_RE.sub("", c.lower()) for c in df_raw.columns}
 
 st.subheader("Preview of selected sheet")
 st.dataframe(df_raw.head())
 st.write("🧲 Columns in file:", list(df_raw.columns))
 
 # ——— find cost‑center column ———
-def match_cost_center_column(columns):
+def match_cost_center_column(df):
     acceptable = ["C/Center","Cost Center","Center","C Center","C-Center"]
-    norm_map    = {col: re.sub(r"[^a-z]", "", col.lower()) for col in columns}
+    idx         = _norm_col_index(df)
     for tgt in acceptable:
-        t_norm = re.sub(r"[^a-z]", "", tgt.lower())
-        for orig, norm in norm_map.items():
-            if norm == t_norm:
-                return orig
+        orig = idx.get(_NORM_RE.sub("", tgt.lower()))
+        if orig is not None:
+            return orig
     return None
 
-cost_col = match_cost_center_column(df_raw.columns)
+cost_col = match_cost_center_column(df_raw)
 if not cost_col:
     st.error("❌ Cost Center column not found.")
     st.stop()
 
+@st.cache_resource(max_entries=UPLOAD_CACHE_ENTRIES)
+def _split_by_dept(file_bytes, sheet, cost_col, _df_raw):
+    """
+    Split df_raw into one frame per cost-center value, built in a single groupby.
+    Keyed on the upload and sheet (df_raw is derived from them and not hashed);
+    the frames are shared, so callers must .copy() before mutating.
+    """
+    return {k: g.reset_index(drop=True) for k, g in _df_raw.groupby(cost_col, sort=False)}
+
 depts    = df_raw[cost_col].dropna().unique().tolist()
 sel_dept = st.selectbox("Select Department", depts)
-df       = df_raw[df_raw[cost_col] == sel_dept].copy()
+df       = _split_by_dept(file_bytes, sheet, cost_col, df_raw)[sel_dept].copy()
 
 # ——— drop resigned staff ———
-df["Joined"] = pd.to_datetime(df["Joined"], errors="coerce")
-df["Resign"] = pd.to_datetime(df["Resign"], errors="coerce")
-df = df[df["Resign"].isna()]
+# date cells already arrive as datetime64, so only parse when they don't;
+# placeholders like "-" or "N/A" are not dates and the employee stays
+if pd.api.types.is_datetime64_any_dtype(df["Resign"]):
+    df = df[df["Resign"].isna()]
+else:
+    df = df[pd.to_datetime(df["Resign"], errors="coerce").isna()]
+
+# ——— numeric conversion (only the columns summed below) ———
+PAY_COLS = [
+    "M/Basic", "OT Amt 1½", "MEC", "ALL", "OVT",
+    "MS", "NS", "ICP", "BAC", "BSC", "BBB", "BAL", "BOT", "CSN",
+]
+DEDUCTION_COLS   = ["EPF", "Socso", "EIS", "PCB"]
+EPF_ER_ALIASES   = ("EPF ER", "EPF'ER", "EPFER")
+EIS_ER_ALIASES   = ("EIS ER", "EIS'ER", "EISER")
+SOCSO_ER_ALIASES = (
+    "Socso ER",
+    "SOC ER",
+    "SOC'ER",
+    "SOCSOER",
+    "Soc 'EE",   # in case your sheet literally says "Soc 'EE"
+)
+ER_ALIASES = EPF_ER_ALIASES + EIS_ER_ALIASES + SOCSO_ER_ALIASES
 
-# ——— numeric conversion ———
-ignore   = ["Name","Emp No",cost_col,"Joined","Resign"]
-num_cols = df.columns.drop(ignore, errors="ignore")
-df[num_cols] = df[num_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+col_idx = _norm_col_index(df)
+needed  = set(PAY_COLS) | set(DEDUCTION_COLS) | {"HRDF"}
+needed |= {col_idx[k] for k in (_NORM_RE.sub("", a.lower()) for a in ER_ALIASES) if k in col_idx}
+needed  = [c for c in df.columns if c in needed]
+df[needed] = df[needed].apply(pd.to_numeric, errors="coerce").fillna(0)
 
 # ——— payroll summary ———
-df["Gross Pay"] = (
-      df.get("M/Basic", 0)
-    + df.get("OT Amt 1½", 0)
-    + df.get("MEC", 0)
-    + df.get("ALL", 0)
-    + df.get("OVT", 0)
-    + df.get("MS", 0) + df.get("NS", 0) + df.get("ICP", 0)
-    + df.get("BAC", 0) + df.get("BSC", 0) + df.get("BBB", 0)
-    + df.get("BAL", 0) + df.get("BOT", 0) + df.get("CSN", 0)
-)
+TOTALS_SIG = "Tuple((f8[:], f8[:], f8[:]))(f8[:, :], f8[:, :])"
+
+def _compute_totals(pay_mat, ded_mat):
+    """Row-wise gross pay, total deduction and net pay in one fused pass."""
+    n     = pay_mat.shape[0]
+    gross = np.empty(n)
+    ded   = np.empty(n)
+    net   = np.empty(n)
+    for i in range(n):
+        g = 0.0
+        for j in range(pay_mat.shape[1]):
+            g += pay_mat[i, j]
+        d = 0.0
+        for j in range(ded_mat.shape[1]):
+            d += ded_mat[i, j]
+        gross[i] = g
+        ded[i]   = d
+        net[i]   = g - d
+    return gross, ded, net
+
+@st.cache_resource
+def _totals_kernel():
+    """
+    Compile _compute_totals eagerly for TOTALS_SIG. Streamlit re-executes the
+    script on every rerun, so the dispatcher is kept per server process and
+    numba's on-disk cache covers cold starts. The kernel is serial: sessions
+    share this dispatcher from their own threads.
+    """
+    return njit(TOTALS_SIG, cache=True)(_compute_totals)
+
+pay_mat = df.reindex(columns=PAY_COLS, fill_value=0).to_numpy(np.float64)
+ded_mat = df.reindex(columns=DEDUCTION_COLS, fill_value=0).to_numpy(np.float64)
+gross, total_ded, net = _totals_kernel()(pay_mat, ded_mat)
+
+df["Gross Pay"]       = gross
 df["EPF"]             = df.get("EPF", 0)
 df["Socso"]           = df.get("Socso", 0)
 df["EIS"]             = df.get("EIS", 0)
 df["PCB"]             = df.get("PCB", 0)
-df["Total Deduction"] = df[["EPF","Socso","EIS","PCB"]].sum(axis=1)
-df["Net Pay"]         = df["Gross Pay"] - df["Total Deduction"]
+df["Total Deduction"] = total_ded
+df["Net Pay"]         = net
 
 st.subheader(f"Payroll Summary: {sel_dept}")
 st.dataframe(df)
 
 # ——— Excel summary download ———
 excel_buf = io.BytesIO()
-with pd.ExcelWriter(excel_buf, engine="xlsxwriter") as writer:
-    df.to_excel(writer, index=False, sheet_name=sel_dept)
+# no "in_memory": xlsxwriter disables constant_memory when it is set
+workbook  = xlsxwriter.Workbook(excel_buf, {
+    "constant_memory":     True,
+    "default_date_format": "yyyy-mm-dd hh:mm:ss",
+})
+ws = workbook.add_worksheet(str(sel_dept))
+ws.write_row(0, 0, df.columns.tolist())
+# blanks instead of NaN/NaT, which xlsxwriter cannot write as numbers
+out = df.astype(object).where(df.notna(), None)
+for r, row in enumerate(out.itertuples(index=False, name=None), start=1):
+    ws.write_row(r, 0, row)
+workbook.close()
 st.download_button(
     "📅 Download Excel Summary",
     data=excel_buf.getvalue(),
@@ -149,63 +283,73 @@ st.download_button(
 )
 
 # ——— Invoice Section ———
+SST_RATE       = 0.08
+MGMT_FEE_RATE  = 0.15
+INSURANCE_FEE  = 50
+PDF_COL_WIDTHS = (10, 80, 20, 40, 40)
+
 st.markdown("### 📄 Generate Department Invoice")
 if st.button("Generate Invoice"):
     try:
+        # document libraries are only needed once an invoice is requested
+        from docx import Document
+        from docx.oxml import parse_xml
+        from docx.oxml.ns import nsdecls
+        from fpdf import FPDF, XPos, YPos
+
         # headcount & sums
         n               = len(df)
         gross_sum       = df["Gross Pay"].sum()
         overtime_total  = df["OT Amt 1½"].sum() + df["BOT"].sum()
 
         # employer statutory: look for EPF ER, EIS ER, and Socso ER variants
-        epf_er   = sum_norm(df, "EPF ER",   "EPF'ER",  "EPFER")
-        eis_er   = sum_norm(df, "EIS ER",   "EIS'ER",  "EISER")
-        socso_er = sum_norm(
-            df,
-            "Socso ER",
-            "SOC ER",
-            "SOC'ER",
-            "SOCSOER",
-            "Soc 'EE"    # in case your sheet literally says "Soc 'EE"
-        )
+        epf_er   = sum_norm(df, *EPF_ER_ALIASES)
+        eis_er   = sum_norm(df, *EIS_ER_ALIASES)
+        socso_er = sum_norm(df, *SOCSO_ER_ALIASES)
         emp_stat = epf_er + socso_er + eis_er
 
         hrdf_amt      = df.get("HRDF", 0).sum()
-        insurance_fee = 50
 
         # Line 1: Wages = Gross Pay – Overtime
         wages = gross_sum - overtime_total
 
-        # Management fee = 15% of (Wages + OT + Statutory + HRDF)
+        # Management fee = MGMT_FEE_RATE of (Wages + OT + Statutory + HRDF)
         mgmt_base = wages + overtime_total + emp_stat + hrdf_amt
-        mgmt_fee  = 0.15 * mgmt_base
+        mgmt_fee  = MGMT_FEE_RATE * mgmt_base
+
+        # round once to the printed 2 dp (Python float rounding, as f"{x:,.2f}"
+        # does) so every line and the totals agree
+        wages, overtime_total, emp_stat, hrdf_amt, mgmt_fee = (
+            round(float(x), 2) for x in (wages, overtime_total, emp_stat, hrdf_amt, mgmt_fee)
+        )
+        insurance_amt = round(float(INSURANCE_FEE * n), 2)
 
         date_str = datetime.today().strftime("%Y-%m-%d")
 
-        # build invoice lines
+        # build invoice lines ("_amt" keeps the rounded amount for the totals)
         items = [
-            {"No.":1, "Description":"Wages",                              "Qty":1, "U.Price":f"{wages:,.2f}",      "Amount":f"{wages:,.2f}"},
-            {"No.":2, "Description":"Overtime",                           "Qty":1, "U.Price":f"{overtime_total:,.2f}", "Amount":f"{overtime_total:,.2f}"},
-            {"No.":3, "Description":"Employer Statutory (EPF+Socso+EIS)", "Qty":1, "U.Price":f"{emp_stat:,.2f}",    "Amount":f"{emp_stat:,.2f}"},
-            {"No.":4, "Description":"HRDF",                               "Qty":1, "U.Price":f"{hrdf_amt:,.2f}",    "Amount":f"{hrdf_amt:,.2f}"},
-            {"No.":5, "Description":"Medical Fee (Excl. Mgmt Fee)",       "Qty":1, "U.Price":"",                     "Amount":""},
-            {"No.":6, "Description":"Insurance Claim (Excl. Mgmt Fee)",   "Qty":n, "U.Price":f"{insurance_fee:,.2f}", "Amount":f"{insurance_fee*n:,.2f}"},
-            {"No.":7, "Description":"15% Management Fee",                "Qty":1, "U.Price":f"{mgmt_fee:,.2f}",    "Amount":f"{mgmt_fee:,.2f}"},
+            {"No.":1, "Description":"Wages",                              "Qty":1, "U.Price":f"{wages:,.2f}",      "Amount":f"{wages:,.2f}",          "_amt":wages},
+            {"No.":2, "Description":"Overtime",                           "Qty":1, "U.Price":f"{overtime_total:,.2f}", "Amount":f"{overtime_total:,.2f}", "_amt":overtime_total},
+            {"No.":3, "Description":"Employer Statutory (EPF+Socso+EIS)", "Qty":1, "U.Price":f"{emp_stat:,.2f}",    "Amount":f"{emp_stat:,.2f}",        "_amt":emp_stat},
+            {"No.":4, "Description":"HRDF",                               "Qty":1, "U.Price":f"{hrdf_amt:,.2f}",    "Amount":f"{hrdf_amt:,.2f}",        "_amt":hrdf_amt},
+            {"No.":5, "Description":"Medical Fee (Excl. Mgmt Fee)",       "Qty":1, "U.Price":"",                     "Amount":"",                        "_amt":0},
+            {"No.":6, "Description":"Insurance Claim (Excl. Mgmt Fee)",   "Qty":n, "U.Price":f"{INSURANCE_FEE:,.2f}", "Amount":f"{insurance_amt:,.2f}",    "_amt":insurance_amt},
+            {"No.":7, "Description":f"{MGMT_FEE_RATE:.0%} Management Fee",  "Qty":1, "U.Price":f"{mgmt_fee:,.2f}",    "Amount":f"{mgmt_fee:,.2f}",        "_amt":mgmt_fee},
         ]
-        inv_df = pd.DataFrame(items)
+
+        # SST calculations (on the 2-dp amounts shown on the invoice)
+        total_excl_sst = sum(item["_amt"] for item in items)
+        sst_amount     = total_excl_sst * SST_RATE
+        total_incl_sst = total_excl_sst + sst_amount
+
+        inv_df = pd.DataFrame(items).drop(columns=["_amt"])
 
         # preview
         st.subheader("Invoice Preview")
         st.table(inv_df)
 
-        # SST calculations
-        total_excl_sst = sum(float(x.replace(",", "")) for x in inv_df["Amount"] if x)
-        sst_rate       = 0.08
-        sst_amount     = total_excl_sst * sst_rate
-        total_incl_sst = total_excl_sst + sst_amount
-
         st.write(f"**Total (Excl. SST):** RM {total_excl_sst:,.2f}")
-        st.write(f"**SST @8%:** RM {sst_amount:,.2f}")
+        st.write(f"**SST @{SST_RATE:.0%}:** RM {sst_amount:,.2f}")
         st.write(f"**Total (Incl. SST):** RM {total_incl_sst:,.2f}")
 
         # — Download Word Invoice ———
@@ -217,13 +361,21 @@ if st.button("Generate Invoice"):
         tbl = doc.add_table(rows=1, cols=len(inv_df.columns))
         for i, col in enumerate(inv_df.columns):
             tbl.rows[0].cells[i].text = col
-        for _, row in inv_df.iterrows():
-            cells = tbl.add_row().cells
-            for i, col in enumerate(inv_df.columns):
-                cells[i].text = str(row[col])
+        # body rows: build the <w:tr> XML once and parse it in a single call
+        rows_xml = "".join(
+            "<w:tr>"
+            + "".join(
+                f'<w:tc><w:p><w:r><w:t xml:space="preserve">{escape(str(val))}</w:t></w:r></w:p></w:tc>'
+                for val in row
+            )
+            + "</w:tr>"
+            for row in inv_df.itertuples(index=False, name=None)
+        )
+        for tr in list(parse_xml(f"<w:tbl {nsdecls('w')}>{rows_xml}</w:tbl>")):
+            tbl._tbl.append(tr)
 
         doc.add_paragraph(f"\nTotal (Excl. SST): RM {total_excl_sst:,.2f}")
-        doc.add_paragraph(f"SST @8%: RM {sst_amount:,.2f}")
+        doc.add_paragraph(f"SST @{SST_RATE:.0%}: RM {sst_amount:,.2f}")
         doc.add_paragraph(f"Total (Incl. SST): RM {total_incl_sst:,.2f}")
 
         word_buf = io.BytesIO()
@@ -239,40 +391,34 @@ if st.button("Generate Invoice"):
         # — Download PDF Invoice ———
         pdf = FPDF()
         pdf.add_page()
-        pdf.set_font("Arial","B",16)
-        pdf.cell(0,10,"INVOICE",ln=True,align="C")
-        pdf.set_font("Arial","",12)
-        pdf.cell(0,8,f"Date: {date_str}",ln=True)
-        pdf.cell(0,8,f"Department: {sel_dept}",ln=True)
+        pdf.set_font("Helvetica","B",16)
+        pdf.cell(0,10,"INVOICE",new_x=XPos.LMARGIN,new_y=YPos.NEXT,align="C")
+        pdf.set_font("Helvetica","",12)
+        pdf.cell(0,8,f"Date: {date_str}",new_x=XPos.LMARGIN,new_y=YPos.NEXT)
+        pdf.cell(0,8,f"Department: {sel_dept}",new_x=XPos.LMARGIN,new_y=YPos.NEXT)
         pdf.ln(5)
 
-        pdf.set_font("Arial","B",12)
-        widths = [10,80,20,40,40]
-        for w, col in zip(widths, inv_df.columns):
+        pdf.set_font("Helvetica","B",12)
+        for w, col in zip(PDF_COL_WIDTHS, inv_df.columns):
             pdf.cell(w,8,col,border=1)
         pdf.ln()
 
-        pdf.set_font("Arial","",12)
-        for _, row in inv_df.iterrows():
-            pdf.cell(widths[0],8,str(row["No."]),border=1)
-            pdf.cell(widths[1],8,row["Description"],border=1)
-            pdf.cell(widths[2],8,str(row["Qty"]),border=1)
-            pdf.cell(widths[3], 8, row["U.Price"], border=1)
-            pdf.cell(widths[4], 8, row["Amount"],  border=1, ln=True)
-
-            
+        pdf.set_font("Helvetica","",12)
+        for no, desc, qty, uprice, amount in inv_df.itertuples(index=False, name=None):
+            pdf.cell(PDF_COL_WIDTHS[0],8,str(no),border=1)
+            pdf.cell(PDF_COL_WIDTHS[1],8,desc,border=1)
+            pdf.cell(PDF_COL_WIDTHS[2],8,str(qty),border=1)
+            pdf.cell(PDF_COL_WIDTHS[3], 8, uprice, border=1)
+            pdf.cell(PDF_COL_WIDTHS[4], 8, amount, border=1, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
 
         pdf.ln(5)
-        pdf.cell(0,8,f"Total (Excl. SST): RM {total_excl_sst:,.2f}",ln=True)
-        pdf.cell(0,8,f"SST @8%: RM {sst_amount:,.2f}",ln=True)
-        pdf.cell(0,8,f"Total (Incl. SST): RM {total_incl_sst:,.2f}",ln=True)
+        pdf.cell(0,8,f"Total (Excl. SST): RM {total_excl_sst:,.2f}",new_x=XPos.LMARGIN,new_y=YPos.NEXT)
+        pdf.cell(0,8,f"SST @{SST_RATE:.0%}: RM {sst_amount:,.2f}",new_x=XPos.LMARGIN,new_y=YPos.NEXT)
+        pdf.cell(0,8,f"Total (Incl. SST): RM {total_incl_sst:,.2f}",new_x=XPos.LMARGIN,new_y=YPos.NEXT)
 
-        pdf_buf = io.BytesIO()
-        pdf_buf.write(pdf.output(dest="S").encode("latin-1"))
-        pdf_buf.seek(0)
         st.download_button(
             "📥 Download PDF Invoice",
-            data=pdf_buf.getvalue(),
+            data=bytes(pdf.output()),
             file_name=f"invoice_{sel_dept}.pdf",
             mime="application/pdf"
         )